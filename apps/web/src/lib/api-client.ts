@@ -8,8 +8,9 @@ interface UploadedFile {
   size: number;
   mime_type: string;
   created_at: string;
-  hash_md5: string;
-  hash_sha256: string;
+  hash_md5?: string;
+  hash_sha256?: string;
+  content_fingerprint?: string;
   perceptual_hash?: string;
   width?: number;
   height?: number;
@@ -4,6 +4,7 @@ Integrated with ML service for advanced similarity detection
 """
 import os
 import hashlib
+import mmap
 import asyncio
 from typing import List, Dict, Optional, Any
 from pathlib import Path
@@ -15,11 +16,22 @@ import json
 from datetime import datetime
 import uuid
 import magic
+import numpy as np
+import pybktree
+import xxhash
 from PIL import Image
 import imagehash
+from collections import defaultdict, OrderedDict
 from app.core.config import settings
 from app.core.database import get_db
 
+# Optional SIMD-accelerated phash (C DCT + turbo image decoders); falls
+# back to the pure-Python imagehash implementation when not installed
+try:
+    from libphash import ImageContext
+except ImportError:
+    ImageContext = None
+
 router = APIRouter(prefix='/dedupe', tags=['Duplicate Detection'])
 
 class ScanOptions(BaseModel):
@@ -34,8 +46,12 @@ class FileMetadata(BaseModel):
     size: int
     mime_type: str
     created_at: datetime
-    hash_md5: str
-    hash_sha256: str
+    hash_md5: Optional[str] = None
+    # Content hashes are None when a file provably has no exact duplicate
+    # in its upload (unique size or head bytes), so hashing it was skipped
+    hash_sha256: Optional[str] = None
+    # Fast non-cryptographic digest used for exact-duplicate bucketing
+    content_fingerprint: Optional[str] = None
     perceptual_hash: Optional[str] = None
     width: Optional[int] = None
     height: Optional[int] = None
@@ -68,40 +84,133 @@ class UploadResult(BaseModel):
     files: List[FileMetadata]
     message: str
 
+# Name of the per-upload metadata sidecar written at upload time so that
+# /scan does not have to re-read and re-hash every file.
+METADATA_FILENAME = '.meta.json'
+
 # Utility Functions
+def save_upload_metadata(upload_dir: Path, files: List[FileMetadata]) -> None:
+    """Persist upload metadata so later scans can reuse it"""
+    meta_path = upload_dir / METADATA_FILENAME
+    with open(meta_path, 'w') as f:
+        json.dump([m.model_dump(mode='json') for m in files], f)
+
+def load_upload_metadata(upload_dir: Path) -> Optional[List[FileMetadata]]:
+    """Load cached upload metadata, or None on cache miss"""
+    meta_path = upload_dir / METADATA_FILENAME
+    if not meta_path.exists():
+        return None
+    try:
+        with open(meta_path, 'r') as f:
+            return [FileMetadata(**item) for item in json.load(f)]
+    except Exception:
+        # Corrupt or stale sidecar - fall back to recomputing
+        return None
+
+# Chunk size for streaming uploads to disk
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Bytes of file head needed for libmagic MIME sniffing
+MAGIC_HEAD_SIZE = 4096
+
+# Files above this size are hashed from an mmap view so the digest
+# consumes page-cache pages directly instead of copying into Python
+# buffers (mmap exposes the buffer protocol, which file_digest does not
+# accept - the hash constructor does)
+MMAP_HASH_THRESHOLD = 16 * 1024 * 1024
+
 def calculate_file_hash(file_path: Path, algorithm: str = 'sha256') -> str:
     """Calculate file hash using specified algorithm"""
-    hash_obj = hashlib.new(algorithm)
     with open(file_path, 'rb') as f:
-        for chunk in iter(lambda: f.read(4096), b''):
-            hash_obj.update(chunk)
-    return hash_obj.hexdigest()
+        size = os.fstat(f.fileno()).st_size
+        if size > MMAP_HASH_THRESHOLD:
+            try:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    return hashlib.new(algorithm, mm).hexdigest()
+            except (ValueError, OSError):
+                # Empty or unmappable file - stream it instead
+                pass
+        # file_digest runs the whole read/update loop in C, dispatching to
+        # SHA-NI/ARMv8 SHA2 where OpenSSL supports it
+        return hashlib.file_digest(f, algorithm).hexdigest()
+
+def calculate_fingerprints(file_path: Path) -> tuple:
+    """Compute the xxh3-128 fingerprint and SHA-256 digest in one read pass"""
+    xxh = xxhash.xxh3_128()
+    sha = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        while chunk := f.read(UPLOAD_CHUNK_SIZE):
+            xxh.update(chunk)
+            sha.update(chunk)
+    return xxh.hexdigest(), sha.hexdigest()
+
+# Perceptual hashes are 64-bit (8x8 DCT from imagehash.phash)
+PHASH_BITS = 64
+
+def phash_to_int(phash_hex: str) -> int:
+    """Parse a hex perceptual hash string into a 64-bit integer"""
+    return int(phash_hex, 16)
+
+def hamming_distance(a: int, b: int) -> int:
+    """Hamming distance between two 64-bit hashes (single POPCNT)"""
+    return (a ^ b).bit_count()
 
 def get_image_hash(file_path: Path) -> Optional[str]:
     """Calculate perceptual hash for images"""
+    if ImageContext is not None:
+        try:
+            with ImageContext(str(file_path)) as ctx:
+                # ctx.phash is a uint64; keep the hex string format used
+                # by the imagehash path
+                return format(ctx.phash, '016x')
+        except Exception:
+            pass  # Unsupported format - fall back to imagehash
     try:
         with Image.open(file_path) as img:
             return str(imagehash.phash(img))
     except Exception:
         return None
 
-def get_file_metadata(file_path: Path, original_name: str) -> FileMetadata:
-    """Extract comprehensive file metadata"""
-    stat = file_path.stat()
-    
+def get_file_metadata(
+    file_path: Path,
+    original_name: str,
+    sha256: Optional[str] = None,
+    compute_phash: bool = True,
+    fingerprint: Optional[str] = None,
+    head_bytes: Optional[bytes] = None,
+    stat_result: Optional[os.stat_result] = None,
+    compute_content_hash: bool = True
+) -> FileMetadata:
+    """Extract comprehensive file metadata
+
+    Digests, head bytes, and stat results already available elsewhere
+    (e.g. from streaming the upload to disk, or from a scandir DirEntry)
+    can be passed in to avoid re-reading or re-statting the file. Setting
+    compute_phash=False defers perceptual hashing so large image batches
+    can be hashed in one ML-service call instead.
+    """
+    stat = stat_result if stat_result is not None else file_path.stat()
+
+    if compute_content_hash and (sha256 is None or fingerprint is None):
+        fingerprint, sha256 = calculate_fingerprints(file_path)
+
     # Basic metadata
     metadata = {
         'id': str(uuid.uuid4()),
         'original_name': original_name,
         'size': stat.st_size,
         'created_at': datetime.fromtimestamp(stat.st_ctime),
-        'hash_md5': calculate_file_hash(file_path, 'md5'),
-        'hash_sha256': calculate_file_hash(file_path, 'sha256')
+        'hash_sha256': sha256,
+        'content_fingerprint': fingerprint
     }
     
-    # Detect MIME type
+    # Detect MIME type from the head bytes - libmagic only needs the first
+    # few KB, so sniffing a buffer avoids another open of the file
     try:
-        metadata['mime_type'] = magic.from_file(str(file_path), mime=True)
+        if head_bytes is None:
+            with open(file_path, 'rb') as f:
+                head_bytes = f.read(MAGIC_HEAD_SIZE)
+        metadata['mime_type'] = magic.from_buffer(head_bytes, mime=True)
     except Exception:
         metadata['mime_type'] = 'application/octet-stream'
     
@@ -111,22 +220,43 @@ def get_file_metadata(file_path: Path, original_name: str) -> FileMetadata:
             with Image.open(file_path) as img:
                 metadata['width'] = img.width
                 metadata['height'] = img.height
-                metadata['perceptual_hash'] = get_image_hash(file_path)
+                if compute_phash:
+                    metadata['perceptual_hash'] = get_image_hash(file_path)
         except Exception:
             pass
     
-    return FileMetadata(**metadata)
+    # Inputs are already well-typed here; skip pydantic validation on the
+    # per-file hot path
+    return FileMetadata.model_construct(**metadata)
+
+# Shared HTTP client for ML-service calls; keep-alive connections amortize
+# the TCP/TLS handshake across requests instead of paying it per call
+_ml_client: Optional[httpx.AsyncClient] = None
+
+def get_ml_client() -> httpx.AsyncClient:
+    """Get the shared ML-service HTTP client, creating it on first use"""
+    global _ml_client
+    if _ml_client is None:
+        _ml_client = httpx.AsyncClient(
+            base_url=settings.ML_SERVICE_URL,
+            timeout=settings.ML_SERVICE_TIMEOUT,
+            limits=httpx.Limits(max_keepalive_connections=32)
+        )
+    return _ml_client
+
+async def close_ml_client() -> None:
+    """Close the shared ML-service HTTP client (application shutdown)"""
+    global _ml_client
+    if _ml_client is not None:
+        await _ml_client.aclose()
+        _ml_client = None
 
 async def call_ml_service(endpoint: str, data: Dict[str, Any]) -> Dict[str, Any]:
     """Call ML service for advanced similarity detection"""
     try:
-        async with httpx.AsyncClient(timeout=settings.ML_SERVICE_TIMEOUT) as client:
-            response = await client.post(
-                f"{settings.ML_SERVICE_URL}{endpoint}",
-                json=data
-            )
-            response.raise_for_status()
-            return response.json()
+        response = await get_ml_client().post(endpoint, json=data)
+        response.raise_for_status()
+        return response.json()
     except httpx.TimeoutException:
         raise HTTPException(status_code=408, detail="ML service timeout")
     except httpx.RequestError:
@@ -134,6 +264,35 @@ async def call_ml_service(endpoint: str, data: Dict[str, Any]) -> Dict[str, Any]
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"ML service error: {str(e)}")
 
+async def fill_phash_batch(upload_dir: Path, files: List[FileMetadata]) -> None:
+    """Fill missing perceptual hashes via one ML-service batch call
+
+    Falls back to local per-file hashing for anything the ML service could
+    not hash (or when it is unavailable).
+    """
+    pending = [
+        f for f in files
+        if f.mime_type.startswith('image/') and f.perceptual_hash is None
+    ]
+    if not pending:
+        return
+
+    try:
+        result = await call_ml_service("/analyze/phash_batch", {
+            "files": [
+                {"id": f.id, "path": str(upload_dir / f.original_name)}
+                for f in pending
+            ]
+        })
+        hashes = result.get("hashes", {})
+    except HTTPException:
+        hashes = {}
+
+    for f in pending:
+        f.perceptual_hash = hashes.get(f.id) or await asyncio.to_thread(
+            get_image_hash, upload_dir / f.original_name
+        )
+
 @router.post('/upload', response_model=UploadResult)
 async def upload_files(
     files: List[UploadFile] = File(..., description="Files to upload and analyze")
@@ -150,37 +309,79 @@ async def upload_files(
     upload_dir = Path(settings.UPLOAD_DIR) / upload_id
     upload_dir.mkdir(parents=True, exist_ok=True)
     
-    file_metadata_list = []
     total_size = 0
-    
+
+    # Validate sizes up front so no bytes are written for a rejected upload
+    for upload_file in files:
+        if upload_file.size and upload_file.size > settings.MAX_FILE_SIZE_MB * 1024 * 1024:
+            raise HTTPException(
+                status_code=400,
+                detail=f"File {upload_file.filename} is too large. Maximum {settings.MAX_FILE_SIZE_MB}MB allowed"
+            )
+
+        total_size += upload_file.size or 0
+
+        if total_size > settings.MAX_TOTAL_UPLOAD_SIZE_MB * 1024 * 1024:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Total upload size too large. Maximum {settings.MAX_TOTAL_UPLOAD_SIZE_MB}MB allowed"
+            )
+
+    # Files are written concurrently, so no two may share a target path:
+    # same-named files from different folders are common in a dedupe
+    # upload, and interleaved chunk writes would corrupt both copies
+    used_names = set()
+    target_names = []
+    for upload_file in files:
+        name = upload_file.filename or "upload"
+        stem, ext = os.path.splitext(name)
+        counter = 1
+        while name in used_names:
+            name = f"{stem} ({counter}){ext}"
+            counter += 1
+        used_names.add(name)
+        target_names.append(name)
+
+    async def process_one(upload_file: UploadFile, target_name: str) -> FileMetadata:
+        # Stream to disk in 1 MiB chunks so memory stays O(chunk) instead
+        # of buffering the whole file in a single bytes object
+        file_path = upload_dir / target_name
+        sha256 = hashlib.sha256()
+        xxh = xxhash.xxh3_128()
+        head = b''
+        with open(file_path, 'wb') as f:
+            while chunk := await upload_file.read(UPLOAD_CHUNK_SIZE):
+                f.write(chunk)
+                # Hash in the same pass that writes, so the file is never
+                # re-read just to compute its digests
+                sha256.update(chunk)
+                xxh.update(chunk)
+                if len(head) < MAGIC_HEAD_SIZE:
+                    head += chunk[:MAGIC_HEAD_SIZE - len(head)]
+
+        # Extract remaining metadata in a worker thread - hashlib releases
+        # the GIL during the C-level update, so work scales across cores
+        return await asyncio.to_thread(
+            get_file_metadata, file_path, target_name,
+            sha256.hexdigest(), not offload_phash, xxh.hexdigest(), head
+        )
+
+    # For large uploads, defer perceptual hashing and run it as a single
+    # batched (GPU-capable) ML-service call instead of per file on the CPU
+    offload_phash = len(files) >= settings.PHASH_BATCH_MIN_FILES
+
     try:
-        for upload_file in files:
-            # Validate file size
-            if upload_file.size and upload_file.size > settings.MAX_FILE_SIZE_MB * 1024 * 1024:
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"File {upload_file.filename} is too large. Maximum {settings.MAX_FILE_SIZE_MB}MB allowed"
-                )
-            
-            total_size += upload_file.size or 0
-            
-            # Check total upload size
-            if total_size > settings.MAX_TOTAL_UPLOAD_SIZE_MB * 1024 * 1024:
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"Total upload size too large. Maximum {settings.MAX_TOTAL_UPLOAD_SIZE_MB}MB allowed"
-                )
-            
-            # Save file
-            file_path = upload_dir / upload_file.filename
-            with open(file_path, 'wb') as f:
-                content = await upload_file.read()
-                f.write(content)
-            
-            # Extract metadata
-            metadata = get_file_metadata(file_path, upload_file.filename)
-            file_metadata_list.append(metadata)
-    
+        file_metadata_list = list(await asyncio.gather(
+            *(process_one(upload_file, target_name)
+              for upload_file, target_name in zip(files, target_names))
+        ))
+
+        if offload_phash:
+            await fill_phash_batch(upload_dir, file_metadata_list)
+
+        # Cache metadata so /scan can skip re-hashing every file
+        save_upload_metadata(upload_dir, file_metadata_list)
+
     except Exception as e:
         # Cleanup on error
         import shutil
@@ -194,6 +395,14 @@ async def upload_files(
         message=f"Successfully uploaded {len(files)} files"
     )
 
+# In-process LRU of scan results so repeat /scan calls (front-end polling,
+# retries) are O(1) instead of re-hashing the whole upload
+SCAN_CACHE_MAX_ENTRIES = 256
+_scan_cache: OrderedDict = OrderedDict()
+
+def _scan_cache_key(upload_id: str, options: ScanOptions) -> tuple:
+    return (upload_id, tuple(sorted(options.model_dump().items())))
+
 @router.post('/scan', response_model=ScanResult)
 async def scan_duplicates(
     upload_id: str,
@@ -203,26 +412,80 @@ async def scan_duplicates(
     similarity_threshold: float = 0.85
 ) -> ScanResult:
     """Scan uploaded files for duplicates using multiple detection methods"""
-    
-    start_time = asyncio.get_event_loop().time()
-    
+
     options = ScanOptions(
         enable_hash_scanning=enable_hash_scanning,
         enable_content_scanning=enable_content_scanning,
         enable_metadata_scanning=enable_metadata_scanning,
         similarity_threshold=similarity_threshold
     )
-    
+
+    cache_key = _scan_cache_key(upload_id, options)
+    cached = _scan_cache.get(cache_key)
+    if cached is not None:
+        _scan_cache.move_to_end(cache_key)
+        return cached
+
+    result = await compute_scan(upload_id, options)
+
+    _scan_cache[cache_key] = result
+    if len(_scan_cache) > SCAN_CACHE_MAX_ENTRIES:
+        _scan_cache.popitem(last=False)
+
+    return result
+
+async def compute_scan(upload_id: str, options: ScanOptions) -> ScanResult:
+    """Run the full duplicate scan for an upload"""
+
+    start_time = asyncio.get_event_loop().time()
+
     upload_dir = Path(settings.UPLOAD_DIR) / upload_id
     if not upload_dir.exists():
         raise HTTPException(status_code=404, detail="Upload not found")
     
-    # Get file metadata
-    files = []
-    for file_path in upload_dir.iterdir():
-        if file_path.is_file():
-            metadata = get_file_metadata(file_path, file_path.name)
-            files.append(metadata)
+    # Reuse metadata computed at upload time; recompute only on cache miss
+    files = load_upload_metadata(upload_dir)
+    if files is None:
+        # scandir serves is_file/stat from the directory read itself, so
+        # listing the upload costs one getdents instead of 2 stats/entry
+        with os.scandir(upload_dir) as it:
+            entries = [
+                e for e in it
+                if e.is_file(follow_symlinks=False) and e.name != METADATA_FILENAME
+            ]
+
+        # jdupes-style pre-bucketing: only files sharing a size class, and
+        # then a head-bytes hash, can be byte-identical. Everything else
+        # skips full-content hashing entirely.
+        size_buckets = defaultdict(list)
+        for entry in entries:
+            size_buckets[entry.stat().st_size].append(entry)
+
+        head_cache = {}
+        needs_full_hash = set()
+        for bucket in size_buckets.values():
+            if len(bucket) < 2:
+                continue
+            head_buckets = defaultdict(list)
+            for entry in bucket:
+                with open(entry.path, 'rb') as f:
+                    head = f.read(MAGIC_HEAD_SIZE)
+                head_cache[entry.path] = head
+                head_buckets[xxhash.xxh3_64_hexdigest(head)].append(entry)
+            for head_bucket in head_buckets.values():
+                if len(head_bucket) > 1:
+                    needs_full_hash.update(e.path for e in head_bucket)
+
+        files = [
+            get_file_metadata(
+                Path(entry.path), entry.name,
+                head_bytes=head_cache.get(entry.path),
+                stat_result=entry.stat(),
+                compute_content_hash=entry.path in needs_full_hash
+            )
+            for entry in entries
+        ]
+        save_upload_metadata(upload_dir, files)
     
     if not files:
         raise HTTPException(status_code=400, detail="No files found in upload")
@@ -239,7 +502,12 @@ async def scan_duplicates(
             if file_meta.id in processed_files:
                 continue
             
-            hash_key = file_meta.hash_sha256
+            # Bucket on the fast fingerprint; SHA-256 stays available for
+            # cross-upload storage and export
+            hash_key = file_meta.content_fingerprint or file_meta.hash_sha256
+            if hash_key is None:
+                # Hashing was skipped - file provably has no exact duplicate
+                continue
             if hash_key not in hash_groups:
                 hash_groups[hash_key] = []
             hash_groups[hash_key].append(file_meta)
@@ -249,7 +517,7 @@ async def scan_duplicates(
             if len(group_files) > 1:
                 keep_file = min(group_files, key=lambda f: f.created_at)
                 duplicates = [
-                    DuplicateMatch(
+                    DuplicateMatch.model_construct(
                         file=f,
                         similarity=1.0,
                         reason="Identical file hash",
@@ -260,7 +528,7 @@ async def scan_duplicates(
                 
                 if duplicates:
                     size_saved = sum(d.file.size for d in duplicates)
-                    duplicate_groups.append(DuplicateGroup(
+                    duplicate_groups.append(DuplicateGroup.model_construct(
                         id=str(uuid.uuid4()),
                         group_index=group_index,
                         keep_file=keep_file,
@@ -283,49 +551,64 @@ async def scan_duplicates(
             if f.mime_type.startswith('image/') and f.perceptual_hash and f.id not in processed_files
         ]
         
-        phash_groups = {}
-        for file_meta in image_files:
-            phash = file_meta.perceptual_hash
-            if not phash:
-                continue
-                
-            # Find similar perceptual hashes
-            found_group = False
-            for existing_phash, group_files in phash_groups.items():
-                # Calculate Hamming distance for perceptual hashes
-                hamming_distance = sum(c1 != c2 for c1, c2 in zip(phash, existing_phash))
-                similarity = 1.0 - (hamming_distance / len(phash))
-                
-                if similarity >= options.similarity_threshold:
-                    group_files.append(file_meta)
-                    found_group = True
-                    break
-            
-            if not found_group:
-                phash_groups[phash] = [file_meta]
-        
-        # Process perceptual hash groups
-        for phash, group_files in phash_groups.items():
-            if len(group_files) > 1:
-                keep_file = min(group_files, key=lambda f: f.created_at)
-                duplicates = []
-                
-                for f in group_files:
-                    if f.id != keep_file.id:
-                        # Calculate actual similarity
-                        hamming_distance = sum(c1 != c2 for c1, c2 in zip(f.perceptual_hash, keep_file.perceptual_hash))
-                        similarity = 1.0 - (hamming_distance / len(f.perceptual_hash))
-                        
-                        duplicates.append(DuplicateMatch(
-                            file=f,
-                            similarity=similarity,
-                            reason="Visually similar image",
-                            match_type="visual"
-                        ))
-                
+        clusters = {}
+        if len(image_files) > 1:
+            # Structure-of-arrays view of the batch: the whole grouping pass
+            # works on these parallel arrays and only touches the pydantic
+            # models again when emitting the final groups
+            phashes = [phash_to_int(f.perceptual_hash) for f in image_files]
+            ctimes = np.array([f.created_at.timestamp() for f in image_files])
+            sizes = np.array([f.size for f in image_files], dtype=np.int64)
+
+            # Index all hashes in a BK-tree so each file only probes the
+            # metric neighborhood within max_dist instead of every group
+            max_dist = int((1.0 - options.similarity_threshold) * PHASH_BITS)
+            tree = pybktree.BKTree(hamming_distance, set(phashes))
+
+            indices_by_phash = defaultdict(list)
+            for i, phash in enumerate(phashes):
+                indices_by_phash[phash].append(i)
+
+            # Union-find over file indices so transitive neighbors merge
+            # into one group regardless of insertion order
+            parent = list(range(len(image_files)))
+
+            def find_root(i: int) -> int:
+                while parent[i] != i:
+                    parent[i] = parent[parent[i]]
+                    i = parent[i]
+                return i
+
+            for i, phash in enumerate(phashes):
+                for _dist, neighbor in tree.find(phash, max_dist):
+                    for j in indices_by_phash[neighbor]:
+                        root_i, root_j = find_root(i), find_root(j)
+                        if root_i != root_j:
+                            parent[root_j] = root_i
+
+            clusters = defaultdict(list)
+            for i in range(len(image_files)):
+                clusters[find_root(i)].append(i)
+
+        for members in clusters.values():
+            if len(members) > 1:
+                members = np.asarray(members)
+                keep_idx = int(members[np.argmin(ctimes[members])])
+                keep_file = image_files[keep_idx]
+                size_saved = int(sizes[members].sum() - sizes[keep_idx])
+
+                duplicates = [
+                    DuplicateMatch.model_construct(
+                        file=image_files[j],
+                        similarity=1.0 - hamming_distance(phashes[keep_idx], phashes[j]) / PHASH_BITS,
+                        reason="Visually similar image",
+                        match_type="visual"
+                    )
+                    for j in members if j != keep_idx
+                ]
+
                 if duplicates:
-                    size_saved = sum(d.file.size for d in duplicates)
-                    duplicate_groups.append(DuplicateGroup(
+                    duplicate_groups.append(DuplicateGroup.model_construct(
                         id=str(uuid.uuid4()),
                         group_index=group_index,
                         keep_file=keep_file,
@@ -333,13 +616,13 @@ async def scan_duplicates(
                         reason="Visual similarity (perceptual hash)",
                         total_size_saved=size_saved
                     ))
-                    
+
                     total_size_saved += size_saved
                     group_index += 1
-                    
+
                     # Mark files as processed
-                    for f in group_files:
-                        processed_files.add(f.id)
+                    for j in members:
+                        processed_files.add(image_files[j].id)
     
     # 3. Content-based similarity using ML service
     if options.enable_content_scanning:
@@ -354,7 +637,10 @@ async def scan_duplicates(
                             "id": f.id,
                             "path": str(upload_dir / f.original_name),
                             "mime_type": f.mime_type,
-                            "size": f.size
+                            "size": f.size,
+                            # Already-computed phash lets the ML side skip
+                            # expensive inference for clearly-distant pairs
+                            "phash": f.perceptual_hash
                         }
                         for f in unprocessed_files
                     ],
@@ -363,18 +649,21 @@ async def scan_duplicates(
                 
                 # Call ML service for content analysis
                 ml_result = await call_ml_service("/analyze/similarity", ml_data)
-                
-                # Process ML results
+
+                # Process ML results, resolving file ids through a dict
+                # instead of an O(N) list scan per lookup
+                by_id = {f.id: f for f in unprocessed_files}
+
                 for group_data in ml_result.get("groups", []):
                     keep_file_id = group_data["keep_file_id"]
                     similar_files = group_data["similar_files"]
-                    
-                    keep_file = next(f for f in unprocessed_files if f.id == keep_file_id)
+
+                    keep_file = by_id[keep_file_id]
                     duplicates = []
-                    
+
                     for similar_file_data in similar_files:
-                        similar_file = next(f for f in unprocessed_files if f.id == similar_file_data["id"])
-                        duplicates.append(DuplicateMatch(
+                        similar_file = by_id[similar_file_data["id"]]
+                        duplicates.append(DuplicateMatch.model_construct(
                             file=similar_file,
                             similarity=similar_file_data["similarity"],
                             reason=similar_file_data["reason"],
@@ -383,7 +672,7 @@ async def scan_duplicates(
                     
                     if duplicates:
                         size_saved = sum(d.file.size for d in duplicates)
-                        duplicate_groups.append(DuplicateGroup(
+                        duplicate_groups.append(DuplicateGroup.model_construct(
                             id=str(uuid.uuid4()),
                             group_index=group_index,
                             keep_file=keep_file,
@@ -417,12 +706,15 @@ async def scan_duplicates(
         scan_options=options
     )
 
-@router.get('/results/{upload_id}')
-async def get_scan_results(upload_id: str):
+@router.get('/results/{upload_id}', response_model=ScanResult)
+async def get_scan_results(upload_id: str) -> ScanResult:
     """Get cached scan results for an upload"""
-    # Implementation for retrieving cached results
-    # This would typically query a database
-    pass
+    # Most recently used entry for this upload wins
+    for key in reversed(_scan_cache):
+        if key[0] == upload_id:
+            return _scan_cache[key]
+
+    raise HTTPException(status_code=404, detail="No scan results for upload")
 
 @router.post('/download')
 async def download_files(
@@ -31,6 +31,9 @@ class Settings(BaseSettings):
     # ML Service Configuration
     ML_SERVICE_URL: str = os.getenv("ML_SERVICE_URL", "http://localhost:8001")
     ML_SERVICE_TIMEOUT: int = int(os.getenv("ML_SERVICE_TIMEOUT", "300"))  # 5 minutes
+    # Uploads with at least this many files offload perceptual hashing to
+    # the ML service as one batch instead of hashing per file on the CPU
+    PHASH_BATCH_MIN_FILES: int = int(os.getenv("PHASH_BATCH_MIN_FILES", "50"))
     
     # Security Configuration
     SECRET_KEY: str = os.getenv("SECRET_KEY", "your-secret-key-change-in-production")
@@ -2,44 +2,53 @@
 Database connection and session management
 """
 import os
-from contextlib import asynccontextmanager
+import time
+import asyncio
 from prisma import Prisma
 from app.core.config import settings
 
 # Global database client
 db_client = None
+_connect_lock = asyncio.Lock()
+
+def _pooled_database_url() -> str:
+    """Database URL with a connection_limit sized to the host"""
+    url = settings.DATABASE_URL
+    if "connection_limit" not in url:
+        separator = '&' if '?' in url else '?'
+        url = f"{url}{separator}connection_limit={(os.cpu_count() or 4) * 2}"
+    return url
 
 async def connect_database():
     """Initialize database connection"""
     global db_client
-    
+
     if db_client is None:
-        db_client = Prisma(
-            datasource={
-                "url": settings.DATABASE_URL
-            }
-        )
-        await db_client.connect()
-    
+        # Double-checked under a lock so concurrent startup cannot race
+        # two clients into existence
+        async with _connect_lock:
+            if db_client is None:
+                client = Prisma(
+                    datasource={
+                        "url": _pooled_database_url()
+                    }
+                )
+                await client.connect()
+                db_client = client
+
     return db_client
 
 async def disconnect_database():
     """Close database connection"""
     global db_client
-    
+
     if db_client is not None:
         await db_client.disconnect()
         db_client = None
 
-@asynccontextmanager
-async def get_db():
-    """Get database session"""
-    client = await connect_database()
-    try:
-        yield client
-    finally:
-        # Keep connection alive for reuse
-        pass
+async def get_db() -> Prisma:
+    """Get the shared database client"""
+    return await connect_database()
 
 async def init_database():
     """Initialize database with required tables"""
@@ -52,12 +61,25 @@ async def init_database():
         print(f"Database initialization failed: {e}")
         raise
 
+# Health probes can fire every second (k8s liveness); cache the result
+# briefly so each one does not cost a round-trip to the database
+HEALTH_CHECK_TTL_SECONDS = 2.0
+_health_cache = {'ts': 0.0, 'result': None}
+
 async def health_check_database():
-    """Check database health"""
+    """Check database health (cached for a couple of seconds)"""
+    if _health_cache['result'] is not None:
+        if time.monotonic() - _health_cache['ts'] < HEALTH_CHECK_TTL_SECONDS:
+            return _health_cache['result']
+
     try:
         client = await connect_database()
         # Simple query to check connection
         result = await client.query_raw("SELECT 1 as test")
-        return {"status": "healthy", "database": "connected"}
+        health = {"status": "healthy", "database": "connected"}
     except Exception as e:
-        return {"status": "unhealthy", "error": str(e)}
+        health = {"status": "unhealthy", "error": str(e)}
+
+    _health_cache['ts'] = time.monotonic()
+    _health_cache['result'] = health
+    return health
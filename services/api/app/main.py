@@ -19,6 +19,7 @@ async def lifespan(app: FastAPI):
     await init_database()
     yield
     # Shutdown
+    await dedupe.close_ml_client()
     await disconnect_database()
     print("Application shutdown complete")
 
@@ -3,7 +3,7 @@ ML Service Configuration
 """
 import os
 from pydantic_settings import BaseSettings
-from typing import List, Optional
+from typing import FrozenSet, Optional
 
 class MLSettings(BaseSettings):
     # App Configuration
@@ -17,8 +17,8 @@ class MLSettings(BaseSettings):
     # Processing Configuration
     MAX_BATCH_SIZE: int = int(os.getenv("MAX_BATCH_SIZE", "32"))
     MAX_FILE_SIZE_MB: int = int(os.getenv("MAX_FILE_SIZE_MB", "50"))
-    SUPPORTED_IMAGE_FORMATS: List[str] = ["jpg", "jpeg", "png", "gif", "webp", "bmp"]
-    SUPPORTED_TEXT_FORMATS: List[str] = ["txt", "pdf", "doc", "docx"]
+    SUPPORTED_IMAGE_FORMATS: FrozenSet[str] = frozenset({"jpg", "jpeg", "png", "gif", "webp", "bmp"})
+    SUPPORTED_TEXT_FORMATS: FrozenSet[str] = frozenset({"txt", "pdf", "doc", "docx"})
     
     # Cache Configuration
     ENABLE_CACHING: bool = os.getenv("ENABLE_CACHING", "true").lower() == "true"
@@ -27,6 +27,12 @@ class MLSettings(BaseSettings):
     
     # Performance Configuration
     USE_GPU: bool = os.getenv("USE_GPU", "true").lower() == "true"
+    # Run the CLIP vision encoder through ONNX Runtime (TensorRT/CUDA EPs
+    # when present); requires onnx + onnxruntime to be installed
+    USE_ONNX: bool = os.getenv("USE_ONNX", "false").lower() == "true"
+    # Compile the CLIP image forward with torch.compile (reduce-overhead
+    # mode captures CUDA graphs for fixed-shape batches)
+    TORCH_COMPILE: bool = os.getenv("TORCH_COMPILE", "true").lower() == "true"
     NUM_WORKERS: int = int(os.getenv("NUM_WORKERS", "4"))
     SIMILARITY_BATCH_SIZE: int = int(os.getenv("SIMILARITY_BATCH_SIZE", "16"))
     
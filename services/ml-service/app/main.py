@@ -106,6 +106,29 @@ async def analyze_similarity(request: dict):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Similarity analysis failed: {str(e)}")
 
+@app.post("/analyze/phash_batch")
+async def analyze_phash_batch(request: dict):
+    """Compute perceptual hashes for a batch of images"""
+    global similarity_service
+
+    if not similarity_service:
+        raise HTTPException(status_code=503, detail="ML service not ready")
+
+    try:
+        files = request.get("files", [])
+
+        if not files:
+            return {"hashes": {}}
+
+        hashes = await similarity_service.compute_phash_batch(
+            [file_info.get("path") for file_info in files]
+        )
+
+        return {"hashes": {file_info["id"]: h for file_info, h in zip(files, hashes)}}
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Perceptual hashing failed: {str(e)}")
+
 @app.post("/analyze/content")
 async def analyze_content(request: dict):
     """Analyze file content for advanced features"""